@@ -0,0 +1,99 @@
+"""
+batch.py
+
+Multi-file support shared by the command-line converters.
+
+Parsing X12 with pyx12 is CPU-bound pure Python, so converting many files one
+after another leaves all but one core idle. run_batch() converts files in
+parallel worker processes. Each worker opens its own input and streams JSON to
+its own output file, so only file names and small results cross the process
+boundary.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+
+def positive_int(value: str) -> int:
+    """
+    argparse type for -j/--jobs: an integer of at least 1.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value!r}")
+    return number
+
+
+def is_output_dir(output: str | None) -> bool:
+    """
+    Check whether a single-input -o/--output names a directory, not a file.
+
+    It does when it is an existing directory or ends with a path separator
+    (e.g. "claims_json/"), so a shell glob that happens to match one file
+    still writes into the directory.
+    """
+    if not output:
+        return False
+    separators = tuple(sep for sep in (os.sep, os.altsep) if sep)
+    return os.path.isdir(output) or output.endswith(separators)
+
+
+def batch_output_paths(
+    inputs: Sequence[str], outdir: str | Path, suffix: str = ".json"
+) -> list[str]:
+    """
+    Choose an output file for each input: <outdir>/<input file stem><suffix>.
+
+    Args:
+        inputs: Input file paths
+        outdir: Output directory; created if it does not exist
+        suffix: Output file extension, e.g. ".json" or ".ndjson"
+
+    Returns:
+        Output file paths, in the same order as inputs
+
+    Raises:
+        ValueError: If two inputs would be written to the same output file
+        FileExistsError: If outdir exists and is not a directory
+    """
+    outdir = Path(outdir)
+    outputs = [str(outdir / (Path(path).stem + suffix)) for path in inputs]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError("input files must have distinct names when writing to a directory")
+    outdir.mkdir(parents=True, exist_ok=True)
+    return outputs
+
+
+def run_batch(
+    convert: Callable[..., Any],
+    inputs: Sequence[str],
+    outputs: Sequence[str],
+    *args: Any,
+    jobs: int | None = None,
+) -> list[Any]:
+    """
+    Call convert(input, output, *args) for every input/output pair in parallel.
+
+    Args:
+        convert: Module-level (picklable) conversion function
+        inputs: Input file paths
+        outputs: Output file paths, one per input
+        *args: Extra arguments passed to every convert() call
+        jobs: Number of worker processes (default: one per CPU)
+
+    Returns:
+        The convert() results, in the same order as inputs. An exception
+        raised by any conversion is re-raised here.
+    """
+    extra = [itertools.repeat(arg) for arg in args]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(convert, inputs, outputs, *extra))
@@ -0,0 +1,118 @@
+"""
+claim_totals.py
+
+Checks that each claim's total charge matches the sum of its service lines.
+
+In an 837P claim, CLM02 (total claim charge) should equal the sum of the SV102
+line charges of the claim's 2400 service lines. This module runs that check
+over the column-oriented output of extract_claim_columns().
+
+Charges are parsed once into flat float arrays: one total per claim, plus all
+line charges laid end to end with an offsets array marking where each claim's
+lines start (claim i owns charges[offsets[i]:offsets[i + 1]]). The checking
+loop then runs over plain numbers. When numba is installed (pip install numba)
+the loop is JIT-compiled on first use and cached on disk; otherwise it runs as
+ordinary Python over lists. numba is imported lazily, so importing this module
+stays cheap either way.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+from typing import Any, Callable, Optional, Sequence
+
+# Allowed difference between CLM02 and the sum of SV102 charges, to absorb
+# floating-point rounding of decimal amounts
+TOLERANCE = 0.005
+
+_kernel: Optional[Callable[..., None]] = None
+
+
+def _flag_mismatches(
+    totals: Sequence[float],
+    charges: Sequence[float],
+    offsets: Sequence[int],
+    flags: Any,
+    tolerance: float,
+) -> None:
+    """
+    Set flags[i] for every claim whose total differs from its line charges.
+
+    Written so that it runs unchanged as plain Python over lists and as a
+    numba nopython function over numpy arrays. NaN (missing or non-numeric)
+    charges never compare greater than the tolerance, so such claims are
+    not flagged.
+    """
+    for i in range(len(totals)):
+        line_sum = 0.0
+        for j in range(offsets[i], offsets[i + 1]):
+            line_sum += charges[j]
+        if abs(totals[i] - line_sum) > tolerance:
+            flags[i] = True
+
+
+def _get_kernel() -> Callable[..., None]:
+    """
+    Return the checking loop, JIT-compiled with numba when it is available.
+    """
+    global _kernel
+    if _kernel is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _kernel = _flag_mismatches
+        else:
+            _kernel = njit(cache=True)(_flag_mismatches)
+    return _kernel
+
+
+def _charge(value: str | None) -> float:
+    """
+    Parse an X12 monetary amount, returning NaN if it is missing or invalid.
+    """
+    try:
+        return float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def find_total_mismatches(
+    total_charges: Sequence[str | None],
+    service_lines: Sequence[Sequence[tuple[str | None, str | None]]],
+    tolerance: float = TOLERANCE,
+) -> list[int]:
+    """
+    Find claims whose total charge does not equal the sum of their line charges.
+
+    Args:
+        total_charges: CLM02 total charge per claim, as returned by
+            extract_claim_columns()
+        service_lines: (procedure_code, line_charge) tuples per claim, as
+            returned by extract_claim_columns()
+        tolerance: Largest difference still treated as a match
+
+    Returns:
+        Indexes of the mismatched claims, in ascending order. Claims with a
+        missing or non-numeric total or line charge are not reported.
+    """
+    kernel = _get_kernel()
+    totals = [_charge(total) for total in total_charges]
+    charges = [_charge(line_charge) for lines in service_lines for _, line_charge in lines]
+    offsets = [0, *itertools.accumulate(len(lines) for lines in service_lines)]
+
+    if kernel is _flag_mismatches:
+        flags = [False] * len(totals)
+        kernel(totals, charges, offsets, flags, tolerance)
+    else:
+        import numpy as np
+
+        flags = np.zeros(len(totals), dtype=np.bool_)
+        kernel(
+            np.array(totals, dtype=np.float64),
+            np.array(charges, dtype=np.float64),
+            np.array(offsets, dtype=np.int64),
+            flags,
+            tolerance,
+        )
+    return [i for i, flagged in enumerate(flags) if flagged]
@@ -0,0 +1,182 @@
+"""
+json_stream.py
+
+Incremental JSON writers shared by the command-line converters.
+
+json.dumps(data, indent=2) needs the whole document in memory and builds the
+complete output string before anything is written. For large X12 files that
+means holding every claim/segment dict *and* its JSON text at the same time.
+
+The helpers here write a JSON array one element at a time, with the same
+layout as json.dumps(..., indent=2) would give the full list, so the
+converters can stream records straight from the parser to the output. The
+result is equivalent JSON, except that non-ASCII characters are written as
+UTF-8 rather than escaped as \\uXXXX.
+
+Encoding uses orjson when it is installed (pip install orjson), falling back to
+the standard library json module. Both produce the same UTF-8 bytes.
+
+Compact output (no indentation or spaces) is also supported. It prefers
+msgspec (pip install msgspec), whose Encoder.encode_into() encodes each
+element straight into one reused buffer, then orjson, then the standard
+library; all three produce the same bytes.
+
+Finally, write_ndjson() writes newline-delimited JSON (one compact document
+per line, no enclosing array), which downstream tools such as Spark, DuckDB
+and jq can split and process in parallel.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+INDENT = b"  "
+
+# Output formats supported by the command-line converters
+FORMATS = ("indent", "compact", "ndjson")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encode an object as UTF-8 JSON with 2-space indentation.
+
+    Equivalent to json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8"),
+    using orjson's C encoder when available.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def dumps_compact(obj: Any) -> bytes:
+    """
+    Encode an object as compact UTF-8 JSON, with no whitespace.
+
+    Equivalent to
+    json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8").
+    """
+    if msgspec is not None:
+        return msgspec.json.encode(obj)
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def write_json_array_compact(items: Iterable[Any], out: BinaryIO) -> None:
+    """
+    Write an iterable as a compact JSON array, one element at a time.
+
+    The output matches dumps_compact(list(items)). With msgspec, every element
+    is encoded into the same bytearray right after its one-byte separator, so
+    no per-element bytes object is created.
+    """
+    if msgspec is not None:
+        encoder = msgspec.json.Encoder()
+        # buf[0] holds the separator ("[" then ","); encode_into() overwrites
+        # and truncates everything after it with the encoded element
+        buf = bytearray(b"[")
+        for item in items:
+            encoder.encode_into(item, buf, 1)
+            out.write(buf)
+            buf[0] = ord(",")
+        empty = buf[0] == ord("[")
+    else:
+        sep = b"["
+        for item in items:
+            out.write(sep + dumps_compact(item))
+            sep = b","
+        empty = sep == b"["
+    out.write(b"[]" if empty else b"]")
+
+
+def write_json_array(items: Iterable[Any], out: BinaryIO, level: int = 0) -> None:
+    """
+    Write an iterable as an indented JSON array, one element at a time.
+
+    Args:
+        items: Iterable (typically a generator) of JSON-serializable objects
+        out: Binary stream to write UTF-8 JSON to
+        level: Nesting depth of the array in the surrounding document; used so
+            the array lines up with json.dumps(..., indent=2) output when it is
+            the value of an enclosing object key
+
+    The layout matches json.dumps(list(items), indent=2) for the same nesting
+    level, including "[]" for an empty iterable; non-ASCII characters are
+    written as UTF-8 rather than \\uXXXX escapes.
+    """
+    outer = INDENT * level
+    inner = outer + INDENT
+    sep = b"[\n"
+    newline = b"\n" + inner
+    for item in items:
+        # One write per element, separator included. JSON strings never
+        # contain raw newlines, so re-indenting the element's own lines is safe.
+        out.write(sep + inner + dumps(item).replace(b"\n", newline))
+        sep = b",\n"
+    if sep == b"[\n":
+        out.write(b"[]")
+    else:
+        out.write(b"\n" + outer + b"]")
+
+
+def write_ndjson(items: Iterable[Any], out: BinaryIO) -> None:
+    """
+    Write an iterable as newline-delimited JSON (NDJSON), one element per line.
+
+    Each line is dumps_compact(item) followed by a newline. With msgspec, every
+    element is encoded into the same reused bytearray.
+    """
+    if msgspec is not None:
+        encoder = msgspec.json.Encoder()
+        buf = bytearray()
+        for item in items:
+            encoder.encode_into(item, buf)
+            buf.extend(b"\n")
+            out.write(buf)
+    else:
+        for item in items:
+            out.write(dumps_compact(item) + b"\n")
+
+
+@contextlib.contextmanager
+def open_output(path: str | Path) -> Iterator[BinaryIO]:
+    """
+    Open an output file for binary writing, replacing it only on success.
+
+    Output is written to a temporary file next to path and moved over path
+    with os.replace() once the block completes. If the block raises (e.g. the
+    input is missing or not X12), the temporary file is removed and any
+    existing file at path is left untouched.
+    """
+    path = Path(path)
+    # mkstemp() picks an unused name, so files left behind by a killed run
+    # never block later ones
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        # mkstemp() creates the file owner-only (0600); give the output the
+        # permissions a plain open() would have
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0o666 & ~umask)
+        with os.fdopen(fd, "wb") as out:
+            yield out
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
@@ -0,0 +1,105 @@
+"""
+test_backends.py
+
+Checks that the optional accelerated backends (numba for claim_totals,
+msgspec/orjson for json_stream) give the same results as the pure-Python
+fallbacks. Run with: python -m pytest
+"""
+
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+import claim_totals
+import json_stream
+
+
+@pytest.fixture(params=["python", "numba"])
+def kernel(request, monkeypatch):
+    """
+    Force claim_totals to use the plain Python loop or the numba kernel.
+    """
+    if request.param == "python":
+        monkeypatch.setattr(claim_totals, "_kernel", claim_totals._flag_mismatches)
+    else:
+        pytest.importorskip("numba")
+        monkeypatch.setattr(claim_totals, "_kernel", None)
+    return request.param
+
+
+@pytest.mark.parametrize(
+    ("total_charges", "service_lines", "expected"),
+    [
+        pytest.param([], [], [], id="no-claims"),
+        pytest.param(["100"], [[("A", "60"), ("B", "40")]], [], id="match"),
+        pytest.param(["100"], [[("A", "60"), ("B", "30")]], [0], id="mismatch"),
+        pytest.param(["0"], [[]], [], id="no-lines-zero-total"),
+        pytest.param(["5"], [[]], [0], id="no-lines-nonzero-total"),
+        pytest.param([None], [[("A", "10")]], [], id="missing-total"),
+        pytest.param(["abc"], [[("A", "10")]], [], id="non-numeric-total"),
+        pytest.param(["10"], [[("A", None)]], [], id="missing-line-charge"),
+        pytest.param(["NaN"], [[("A", "10")]], [], id="nan-total"),
+        pytest.param(["10.004"], [[("A", "10")]], [], id="within-tolerance"),
+        pytest.param(["10.006"], [[("A", "10")]], [0], id="outside-tolerance"),
+        pytest.param(
+            ["10", "20", "30"],
+            [[("A", "10")], [("B", "5"), ("C", "5")], [("D", "30")]],
+            [1],
+            id="several-claims",
+        ),
+    ],
+)
+def test_find_total_mismatches(kernel, total_charges, service_lines, expected):
+    assert claim_totals.find_total_mismatches(total_charges, service_lines) == expected
+
+
+@pytest.fixture(params=["msgspec", "orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    """
+    Force json_stream to use one encoder backend.
+    """
+    if request.param != "stdlib":
+        module = pytest.importorskip(request.param)
+        monkeypatch.setattr(json_stream, request.param, module)
+    if request.param != "msgspec":
+        monkeypatch.setattr(json_stream, "msgspec", None)
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_stream, "orjson", None)
+    return request.param
+
+
+ITEMS = [
+    {"claim_id": "12345", "total_charge": "100", "service_lines": []},
+    {"claim_id": "12é45", "total_charge": None, "service_lines": [("A", "1")]},
+    ["SV1", "HC:99213", "60"],
+    "plain",
+    None,
+]
+
+
+def _compact(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+@pytest.mark.parametrize("items", [ITEMS, []], ids=["items", "empty"])
+def test_write_json_array_compact(encoder, items):
+    out = io.BytesIO()
+    json_stream.write_json_array_compact(iter(items), out)
+    assert out.getvalue() == _compact(items)
+
+
+@pytest.mark.parametrize("items", [ITEMS, []], ids=["items", "empty"])
+def test_write_ndjson(encoder, items):
+    out = io.BytesIO()
+    json_stream.write_ndjson(iter(items), out)
+    assert out.getvalue() == b"".join(_compact(item) + b"\n" for item in items)
+
+
+@pytest.mark.parametrize("items", [ITEMS, []], ids=["items", "empty"])
+def test_write_json_array(encoder, items):
+    out = io.BytesIO()
+    json_stream.write_json_array(iter(items), out)
+    assert out.getvalue() == json.dumps(items, indent=2, ensure_ascii=False).encode("utf-8")
@@ -0,0 +1,137 @@
+"""
+test_cli.py
+
+Runs the two command-line converters as subprocesses and checks which output
+files they write, and checks that json_stream.open_output() only replaces an
+output file on success. Run with: python -m pytest
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from json_stream import open_output
+
+HERE = Path(__file__).resolve().parent
+SAMPLE = HERE / "x12_837p_data" / "sample_837p.txt"
+SAMPLES = sorted((HERE / "x12_837p_data").glob("*.txt"))
+CLIS = ["x12_837p_to_claims_json.py", "x12_to_json_flat.py"]
+
+
+def run_cli(script: str, *args: str | Path) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, str(HERE / script), *map(str, args)],
+        capture_output=True,
+        text=True,
+    )
+
+
+@pytest.mark.parametrize("script", CLIS)
+def test_single_input_to_file(tmp_path, script):
+    out = tmp_path / "out.json"
+    result = run_cli(script, SAMPLE, "-o", out)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(out.read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("script", CLIS)
+def test_single_input_to_existing_directory(tmp_path, script):
+    result = run_cli(script, SAMPLE, "-o", tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert [p.name for p in tmp_path.iterdir()] == ["sample_837p.json"]
+
+
+@pytest.mark.parametrize("script", CLIS)
+def test_single_input_to_new_directory(tmp_path, script):
+    outdir = tmp_path / "newdir"
+    result = run_cli(script, SAMPLE, "-o", f"{outdir}/")
+    assert result.returncode == 0, result.stderr
+    assert [p.name for p in outdir.iterdir()] == ["sample_837p.json"]
+
+
+@pytest.mark.parametrize("script", CLIS)
+def test_multiple_inputs_to_directory(tmp_path, script):
+    outdir = tmp_path / "out"
+    result = run_cli(script, *SAMPLES, "-o", outdir, "-j", "2")
+    assert result.returncode == 0, result.stderr
+    assert sorted(p.name for p in outdir.iterdir()) == [p.stem + ".json" for p in SAMPLES]
+
+
+@pytest.mark.parametrize("script", CLIS)
+@pytest.mark.parametrize("jobs", ["0", "-1", "abc"])
+def test_invalid_jobs(tmp_path, script, jobs):
+    result = run_cli(script, *SAMPLES, "-o", tmp_path, "-j", jobs)
+    assert result.returncode == 2
+    assert "-j/--jobs" in result.stderr
+    assert "Traceback" not in result.stderr
+
+
+@pytest.mark.parametrize("script", CLIS)
+def test_multiple_inputs_output_is_a_file(tmp_path, script):
+    out = tmp_path / "out.json"
+    out.write_text("keep")
+    result = run_cli(script, *SAMPLES, "-o", out)
+    assert result.returncode == 2
+    assert "not a directory" in result.stderr
+    assert "Traceback" not in result.stderr
+    assert out.read_text() == "keep"
+
+
+def test_open_output_replaces_on_success(tmp_path):
+    out = tmp_path / "out.json"
+    out.write_text("old")
+    with open_output(out) as f:
+        f.write(b"new")
+    assert out.read_text() == "new"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.json"]
+
+
+def test_open_output_keeps_existing_file_on_error(tmp_path):
+    out = tmp_path / "out.json"
+    out.write_text("old")
+    with pytest.raises(RuntimeError):
+        with open_output(out) as f:
+            f.write(b"partial")
+            raise RuntimeError
+    assert out.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.json"]
+
+
+def test_open_output_ignores_leftover_temp_files(tmp_path):
+    out = tmp_path / "out.json"
+    # Names a killed run could have left behind
+    for pid in (1, os.getpid()):
+        (tmp_path / f".out.json.{pid}.tmp").write_text("stale")
+    with open_output(out) as f:
+        f.write(b"new")
+    assert out.read_text() == "new"
+
+
+@pytest.mark.parametrize("script", CLIS)
+def test_failed_conversion_keeps_existing_output(tmp_path, script):
+    out = tmp_path / "out.json"
+    out.write_text("keep")
+    bad = tmp_path / "empty.txt"
+    bad.write_text("")
+    result = run_cli(script, bad, "-o", out)
+    assert result.returncode != 0
+    assert out.read_text() == "keep"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["empty.txt", "out.json"]
+
+
+def test_flat_only_is_normalized():
+    expected = run_cli("x12_to_json_flat.py", SAMPLE, "--only", "CLM,SV1")
+    result = run_cli("x12_to_json_flat.py", SAMPLE, "--only", "clm, sv1,")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == expected.stdout
+    segments = json.loads(result.stdout)["segments"]
+    assert {seg["segment_id"] for seg in segments if seg["elements"] is not None} == {
+        "CLM",
+        "SV1",
+    }
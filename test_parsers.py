@@ -0,0 +1,175 @@
+"""
+test_parsers.py
+
+Checks the parsers against the sample files and against pyx12's own lookups.
+
+The claims parser reads CLM/SV1 elements and 2400 loops by walking pyx12 nodes
+directly instead of calling get_value()/select(); these tests pin that the
+results are the same. They also run both parsers over memory-mapped input,
+which is otherwise only used for files above 32 MB, and check the flat
+parser's segment ID filter in both the Python and the compiled loop.
+Run with: python -m pytest
+"""
+
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+import pyx12.x12file as x12file
+from pyx12.error_handler import errh_null
+from pyx12.x12context import X12ContextReader, X12LoopDataNode
+
+import x12_837p_to_claims_json as claims
+import x12_source
+import x12_to_json_flat as flat
+from x12_source import open_x12
+
+HERE = Path(__file__).resolve().parent
+SAMPLE = HERE / "x12_837p_data" / "sample_837p.txt"
+SAMPLES = sorted((HERE / "x12_837p_data").glob("*.txt"))
+
+
+@pytest.fixture
+def edge_case_sample(tmp_path):
+    """
+    sample_837p.txt with a CLM lacking CLM02, an SV1 lacking SV102 and a
+    composite SV101 with a modifier.
+    """
+    text = SAMPLE.read_text(encoding="utf-8")
+    for old, new in [
+        ("CLM*12345*500***11:B:1*Y*A*Y*I~", "CLM*12345~"),
+        ("SV1*HC:99213*150*UN*1***1~", "SV1*HC:99213~"),
+        ("SV1*HC:87070*350", "SV1*HC:87070:25*350"),
+    ]:
+        assert old in text
+        text = text.replace(old, new)
+    path = tmp_path / "edge_cases.txt"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def _claim_loops(path):
+    with open_x12(path) as f:
+        reader = X12ContextReader(claims._get_params(), errh_null(), f)
+        for node in reader.iter_segments("2300"):
+            if isinstance(node, X12LoopDataNode):
+                yield node
+
+
+def _check_against_pyx12(path):
+    count = 0
+    for claim_loop in _claim_loops(path):
+        assert claims._read_clm(claim_loop) == (
+            claim_loop.get_value("CLM01"),
+            claim_loop.get_value("CLM02"),
+        )
+        service_lines = list(claims._child_loops(claim_loop, "2400"))
+        assert service_lines == list(claim_loop.select("2400"))
+        for sl_loop in service_lines:
+            assert claims._read_sv1(sl_loop) == (
+                sl_loop.get_value("SV101"),
+                sl_loop.get_value("SV102"),
+            )
+        count += 1
+    assert count > 0
+
+
+@pytest.mark.parametrize("path", SAMPLES, ids=lambda p: p.name)
+def test_readers_match_pyx12(path):
+    _check_against_pyx12(path)
+
+
+def test_readers_match_pyx12_edge_cases(edge_case_sample):
+    _check_against_pyx12(edge_case_sample)
+    assert claims.extract_claims_from_837p(edge_case_sample) == [
+        {
+            "claim_id": "12345",
+            "total_charge": None,
+            "service_lines": [
+                {"procedure_code": "HC:99213", "line_charge": None},
+                {"procedure_code": "HC:87070:25", "line_charge": "350"},
+            ],
+        }
+    ]
+
+
+def test_extract_claims_from_837p():
+    assert claims.extract_claims_from_837p(SAMPLE) == [
+        {
+            "claim_id": "12345",
+            "total_charge": "500",
+            "service_lines": [
+                {"procedure_code": "HC:99213", "line_charge": "150"},
+                {"procedure_code": "HC:87070", "line_charge": "350"},
+            ],
+        }
+    ]
+
+
+@pytest.mark.parametrize("path", SAMPLES, ids=lambda p: p.name)
+def test_mmap_matches_in_memory(monkeypatch, path):
+    expected_claims = claims.extract_claims_from_837p(path)
+    expected_flat = flat.x12_to_flat_json(path)
+
+    # Memory-map every file, however small
+    monkeypatch.setattr(x12_source, "SLURP_MAX_BYTES", 0)
+    with open_x12(path) as f:
+        assert not isinstance(f, io.StringIO)
+        assert f.read() == path.read_text(encoding="utf-8")
+    assert f.closed
+    assert claims.extract_claims_from_837p(path) == expected_claims
+    assert flat.x12_to_flat_json(path) == expected_flat
+
+
+def test_mmap_reader_small_reads():
+    data = SAMPLE.read_bytes()
+    reader = x12_source._MmapReader(SAMPLE)
+    chunks = []
+    buf = bytearray(7)
+    while n := reader.readinto(buf):
+        chunks.append(bytes(buf[:n]))
+    assert b"".join(chunks) == data
+    assert reader.readinto(buf) == 0
+    reader.close()
+    reader.close()
+    assert reader.closed
+
+
+@pytest.fixture(params=["python", "cython"])
+def segment_dicts(request):
+    """
+    The flat parser's per-segment loop: pure Python or the compiled extension.
+    """
+    if request.param == "python":
+        return flat._py_segment_dicts
+    return pytest.importorskip("x12_flat_fast").segment_dicts
+
+
+def _flat_segments(segment_dicts, path, only=None):
+    with open_x12(path) as f:
+        return list(segment_dicts(x12file.X12Reader(f), only))
+
+
+@pytest.mark.parametrize("path", SAMPLES, ids=lambda p: p.name)
+def test_flat_only_filter(segment_dicts, path):
+    full = _flat_segments(segment_dicts, path)
+    filtered = _flat_segments(segment_dicts, path, frozenset({"CLM", "SV1"}))
+
+    # Every segment is still listed, in file order
+    assert [seg["segment_id"] for seg in filtered] == [seg["segment_id"] for seg in full]
+    for seg, full_seg in zip(filtered, full):
+        if seg["segment_id"] in ("CLM", "SV1"):
+            assert seg["elements"] == full_seg["elements"]
+            assert seg["elements"]
+        else:
+            assert seg["elements"] is None
+    assert any(seg["elements"] is not None for seg in filtered)
+
+
+def test_flat_only_filter_matches_api():
+    only = frozenset({"CLM", "SV1"})
+    assert flat.x12_to_flat_json(SAMPLE, only)["segments"] == _flat_segments(
+        flat._py_segment_dicts, SAMPLE, only
+    )
@@ -17,12 +17,262 @@ Key X12 837P Concepts:
 from __future__ import annotations
 
 from pathlib import Path
-import json
+import functools
+import itertools
+import sys
+from sys import intern
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
 
 # PyX12 library imports for parsing X12 EDI files
 from pyx12.params import ParamsUnix
 from pyx12.error_handler import errh_null
-from pyx12.x12context import X12ContextReader
+from pyx12.path import X12Path
+from pyx12.x12context import X12ContextReader, X12LoopDataNode
+
+from json_stream import (
+    FORMATS,
+    open_output,
+    write_json_array,
+    write_json_array_compact,
+    write_ndjson,
+)
+from x12_source import open_x12
+
+# Loop holding the service lines of a claim
+_SERVICE_LINE_LOOP = "2400"
+
+# Internal claim representation used while parsing: service lines are
+# (procedure_code, line_charge) pairs and claims are
+# (claim_id, total_charge, service_lines) tuples.
+ServiceLine = tuple[str | None, str | None]
+ClaimRow = tuple[str | None, str | None, list[ServiceLine]]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_params() -> ParamsUnix:
+    """
+    Return the shared pyx12 parameters, reading them on first use.
+
+    ParamsUnix reads any pyx12 config files on construction. X12ContextReader
+    only reads from it, so one instance is reused for every file instead of
+    re-reading the configuration per call.
+    """
+    # ParamsUnix sets map_path and other defaults for you
+    # [oai_citation:6‡PyX12](https://pyx12.sourceforge.net/doc/epydoc/pyx12.params-pysrc.html?utm_source=chatgpt.com)
+    return ParamsUnix()
+
+
+def _first_segment(node, seg_id: str):
+    """
+    Return the first segment with the given ID directly under a loop node.
+
+    Equivalent to node.get_first_matching_segment(seg_id) for an unqualified
+    segment ID, without building an X12Path for every lookup.
+    """
+    for child in node.children:
+        if child.type == "seg" and child.seg_data.get_seg_id() == seg_id:
+            return child.seg_data
+    return None
+
+
+def _child_loops(node, loop_id: str) -> Iterator:
+    """
+    Yield the loops with the given ID directly under a loop node.
+
+    Equivalent to node.select(loop_id) for a single loop ID, scanning the
+    node's children once instead of evaluating an X12 path selector.
+    """
+    for child in node.children:
+        if child.type == "loop" and child.id == loop_id:
+            yield child
+
+
+def _segment_reader(*ref_designators: str) -> Callable[[Any], tuple]:
+    """
+    Build a reader specialized for a fixed set of elements of one segment.
+
+    The reference designators (e.g. "CLM01", "CLM02") are parsed once, here,
+    with the same X12Path parser that get_value() runs on every call, and
+    reduced to a segment ID and zero-based indexes into Segment.elements.
+
+    The returned reader takes a loop node and returns the formatted values in
+    the order given, matching what loop.get_value(ref) would return for each
+    reference: None if the segment or element is missing.
+    """
+    seg_ids = set()
+    indexes = []
+    for ref_des in ref_designators:
+        xpath = X12Path(ref_des)
+        if xpath.seg_id is None or xpath.ele_idx is None or xpath.subele_idx is not None:
+            raise ValueError(f"{ref_des} is not a simple element reference")
+        seg_ids.add(xpath.seg_id)
+        indexes.append(xpath.ele_idx - 1)
+    if len(seg_ids) != 1:
+        raise ValueError(f"{ref_designators} do not all refer to the same segment")
+    seg_id = seg_ids.pop()
+    missing = (None,) * len(indexes)
+
+    def read(node) -> tuple:
+        seg = _first_segment(node, seg_id)
+        if seg is None:
+            return missing
+        elements = seg.elements
+        count = len(elements)
+        return tuple([elements[i].format() if i < count else None for i in indexes])
+
+    return read
+
+
+# Readers for the elements extracted from every claim and service line,
+# specialized once at import time
+_read_clm = _segment_reader("CLM01", "CLM02")
+_read_sv1 = _segment_reader("SV101", "SV102")
+
+
+def _iter_claim_rows(path: str | Path) -> Iterator[ClaimRow]:
+    """
+    Yield (claim_id, total_charge, service_lines) tuples from an X12 837P file.
+
+    This is the parsing core shared by every public entry point. Claims are
+    kept as plain tuples, with each service line a (procedure_code,
+    line_charge) tuple, so no dicts are built while parsing; they are only
+    assembled at the JSON boundary (see _claim_dict()).
+    """
+    path = Path(path)
+
+    param = _get_params()  # Configuration for X12 parsing (map files, delimiters, etc.)
+    # Null error handler (silently ignores errors). Created per file: it tracks
+    # the current line and node, so it must not be shared between parses.
+    errh = errh_null()
+
+    # Open and parse X12 837P file (read into memory up front unless very large).
+    with open_x12(path) as f:
+        # X12ContextReader provides hierarchial parsing of X12 segments and loops
+        ctx = X12ContextReader(param, errh, f)
+        # Iterate over 2300 loops (claims)
+        # 2300 = Claim loop in 837P; README uses same pattern
+        # [oai_citation:7‡GitHub](https://github.com/azoner/pyx12?utm_source=chatgpt.com)
+        for claim_loop in ctx.iter_segments("2300"):
+            # FILTER: Skip entries that aren't claim loops
+            # iter_segments() returns both actual 2300 loops AND the individual
+            # segments outside them; only the loops hold claim data
+            if not isinstance(claim_loop, X12LoopDataNode):
+                continue
+
+            # Claim header info (CLM segment inside 2300)
+            # CLM01: Patient control number, CLM02: Total claim charge
+            claim_id, total_charge = _read_clm(claim_loop)
+
+            # You can add more CLMxx / REF / HI / DTP etc. as needed:
+            # service_location = claim_loop.get_value("CLM05-1")  # etc.
+
+            service_lines = []
+            # Iterate over 2400 loops (service lines) under this claim
+            # [oai_citation:8‡GitHub](https://github.com/azoner/pyx12?utm_source=chatgpt.com)
+            for sl_loop in _child_loops(claim_loop, _SERVICE_LINE_LOOP):
+                # Extract service line details (SV1 segment inside 2400)
+                # SV1-01: Procedure code (CPT/HCPCS) - composite field
+                # SV1-02: Line item charge
+                procedure_code, line_charge = _read_sv1(sl_loop)
+                # Procedure codes repeat heavily across claims; share one
+                # string object per distinct code
+                if procedure_code:
+                    procedure_code = intern(procedure_code)
+
+                # Record the service line as a (procedure_code, line_charge) pair
+                # Additional  line-level data can be added:
+                # - SV103 Unit/basis for measurement code
+                # - SV104: Service unit count
+                # - Procedure modifiers (SV101-3, SV101-4, etc)
+                # - DTP segments for service dates
+                # - REF segments for line-level references
+                service_lines.append((procedure_code, line_charge))
+
+            # Yield the complete claim with all its service lines.
+            yield claim_id, total_charge, service_lines
+
+
+def _claim_dict(
+    claim_id: str | None, total_charge: str | None, service_lines: list[ServiceLine]
+) -> dict:
+    """
+    Build the JSON-serializable claim dict for one parsed claim.
+    """
+    return {
+        "claim_id": claim_id,
+        "total_charge": total_charge,
+        "service_lines": [
+            {
+                "procedure_code": procedure_code,
+                "line_charge": line_charge,
+            }
+            for procedure_code, line_charge in service_lines
+        ],
+    }
+
+
+def iter_claims_from_837p(path: str | Path) -> Iterator[dict]:
+    """
+    Yield claims from an X12 837P file one at a time as they are parsed.
+
+    This is the streaming form of extract_claims_from_837p(): each claim dict is
+    yielded as soon as its 2300 loop has been read, so callers can write output
+    incrementally instead of holding every claim in memory.
+
+    Args:
+        path: File path to the X12 837P file (string or Path object)
+
+    Yields:
+        One claim dictionary per 2300 loop, in the format documented on
+        extract_claims_from_837p().
+    """
+    for row in _iter_claim_rows(path):
+        yield _claim_dict(*row)
+
+
+def extract_claim_columns(
+    path: str | Path,
+) -> tuple[list[str | None], list[str | None], list[list[ServiceLine]]]:
+    """
+    Extract claims from an X12 837P file as parallel lists instead of dicts.
+
+    This column-oriented form avoids building a dict per claim and per service
+    line, which adds up on large files. Index i of each list describes claim i.
+    Use claims_from_columns() to turn the result into claim dicts.
+
+    Args:
+        path: File path to the X12 837P file (string or Path object)
+
+    Returns:
+        Tuple of (claim_ids, total_charges, service_lines) where service_lines[i]
+        is a list of (procedure_code, line_charge) tuples for claim i.
+    """
+    # The lists grow by append rather than being pre-sized: an 837P carries no
+    # claim count up front (BHT has none and SE01 only arrives at the end of
+    # the transaction), and a separate pre-scan of the file to count CLM
+    # segments would cost far more than the amortized list resizes it saves.
+    claim_ids: list[str | None] = []
+    total_charges: list[str | None] = []
+    service_lines: list[list[ServiceLine]] = []
+    for claim_id, total_charge, lines in _iter_claim_rows(path):
+        claim_ids.append(claim_id)
+        total_charges.append(total_charge)
+        service_lines.append(lines)
+    return claim_ids, total_charges, service_lines
+
+
+def claims_from_columns(
+    claim_ids: list[str | None],
+    total_charges: list[str | None],
+    service_lines: list[list[ServiceLine]],
+) -> Iterator[dict]:
+    """
+    Yield claim dicts from the parallel lists returned by extract_claim_columns().
+
+    The dicts have the same format as those from extract_claims_from_837p().
+    """
+    for row in zip(claim_ids, total_charges, service_lines):
+        yield _claim_dict(*row)
 
 
 def extract_claims_from_837p(path: str | Path) -> list[dict]:
@@ -57,87 +307,152 @@ def extract_claims_from_837p(path: str | Path) -> list[dict]:
         ]
 
     """
-    path = Path(path)
+    # Collect the streamed claims into a list.
+    return list(iter_claims_from_837p(path))
 
-    # ParamsUnix sets map_path and other defaults for you
-    # [oai_citation:6‡PyX12](https://pyx12.sourceforge.net/doc/epydoc/pyx12.params-pysrc.html?utm_source=chatgpt.com)
-    param = ParamsUnix()  # Configuration for X12 parsing (map files, delimiters, etc.)
-    errh = errh_null()  # Null error handler (silently ignores errors)
 
-    # List to accumulate all claims found in the file
-    claims: list[dict] = []  #
+def write_claims_json(claims: Iterable[dict], out: BinaryIO, fmt: str = "indent") -> None:
+    """
+    Stream claims to a binary stream as a JSON array or as NDJSON.
 
-    # Open and parse X12 837P file.
-    with path.open("r") as f:
-        # X12ContextReader provides hierarchial parsing of X12 segments and loops
-        ctx = X12ContextReader(param, errh, f)
-        # Iterate over 2300 loops (claims)
-        # 2300 = Claim loop in 837P; README uses same pattern
-        # [oai_citation:7‡GitHub](https://github.com/azoner/pyx12?utm_source=chatgpt.com)
-        for claim_loop in ctx.iter_segments("2300"):
-            # Claim header info (CLM segment inside 2300)
-            claim_id = claim_loop.get_value("CLM01")  # Patient control number
-            total_charge = claim_loop.get_value("CLM02")  # Total claim charge
+    Claims are written as they are produced, so when given the generator from
+    iter_claims_from_837p() neither the claim list nor the full JSON text is
+    ever held in memory. The default "indent" format is equivalent to
+    json.dumps(list(claims), indent=2), with non-ASCII characters written as
+    UTF-8 rather than \\uXXXX escapes.
 
-            # FILTER: Skip entries that don't have claim data
-            # iter_segments() returns both actual loops AND individual segments
-            # Only process entries that have a CLM segment with data
-            if claim_id is None and total_charge is None:
-                continue
+    Args:
+        claims: Claim dicts, e.g. iter_claims_from_837p(path) or
+            claims_from_columns(*extract_claim_columns(path))
+        out: Binary stream to write the UTF-8 JSON array to
+        fmt: Output format, one of json_stream.FORMATS: "indent" (indented
+            JSON array), "compact" (JSON array without whitespace) or "ndjson"
+            (one compact claim per line, no enclosing array)
+    """
+    claims = iter(claims)
+    # Parse the first claim before writing anything so that an unreadable
+    # file raises without leaving a partial document behind
+    first = list(itertools.islice(claims, 1))
+    claims = itertools.chain(first, claims)
+    if fmt == "ndjson":
+        write_ndjson(claims, out)
+    elif fmt == "compact":
+        write_json_array_compact(claims, out)
+    else:
+        write_json_array(claims, out)
 
-            # You can add more CLMxx / REF / HI / DTP etc. as needed:
-            # service_location = claim_loop.get_value("CLM05-1")  # etc.
 
-            service_lines = []
-            # Iterate over 2400 loops (service lines) under this claim
-            # [oai_citation:8‡GitHub](https://github.com/azoner/pyx12?utm_source=chatgpt.com)
-            for sl_loop in claim_loop.select("2400"):
-                # Extract service line details (SV1 segment inside 2400)
-                procedure_code = sl_loop.get_value(
-                    "SV101"
-                )  # SV1-01: Procedure code (CPT/HCPCS) - composite field
-                line_charge = sl_loop.get_value("SV102")  # SV1-02: Line item charge
+def _convert_file(
+    input_path: str, output_path: str | None, check_totals: bool = False, fmt: str = "indent"
+) -> list[str]:
+    """
+    Convert one 837P file for the command-line interface.
 
-                # Build service line dictionary
-                service_lines.append(
-                    {
-                        "procedure_code": procedure_code,
-                        "line_charge": line_charge,
-                        # Additional  line-level data can be added:
-                        # - SV103 Unit/basis for measurement code
-                        # - SV104: Service unit count
-                        # - Procedure modifiers (SV101-3, SV101-4, etc)
-                        # - DTP segments for service dates
-                        # - REF segments for line-level references
-                    }
-                )
-
-            # Append the complete claim with all its service lines to the claims list.
-            claims.append(
-                {
-                    "claim_id": claim_id,
-                    "total_charge": total_charge,
-                    "service_lines": service_lines,
-                }
-            )
-
-    # Return all extracted claims.
-    return claims
+    Writes the claims in the given output format (see write_claims_json()) to
+    output_path, or to stdout when it is None. With check_totals, also checks each claim's total
+    against its line charges.
+
+    Returns:
+        One message per claim whose total charge does not match (always empty
+        unless check_totals is set)
+    """
+    if check_totals:
+        # Keep the parsed columns so the totals can be checked once the
+        # claims have been written
+        claim_ids, total_charges, service_lines = extract_claim_columns(input_path)
+        claims = claims_from_columns(claim_ids, total_charges, service_lines)
+    else:
+        # Stream claims to the output as they are parsed rather than building
+        # the whole list and its JSON text in memory first.
+        claims = iter_claims_from_837p(input_path)
+
+    if output_path:
+        with open_output(output_path) as out:
+            write_claims_json(claims, out, fmt)
+    else:
+        write_claims_json(claims, sys.stdout.buffer, fmt)
+        if fmt != "ndjson":
+            # NDJSON lines are already newline-terminated
+            sys.stdout.buffer.write(b"\n")
+
+    if not check_totals:
+        return []
+
+    from claim_totals import find_total_mismatches
+
+    messages = []
+    for i in find_total_mismatches(total_charges, service_lines):
+        line_sum = ", ".join(str(charge) for _, charge in service_lines[i])
+        messages.append(
+            f"{input_path}: claim {claim_ids[i]}: total charge {total_charges[i]} "
+            f"!= sum of line charges ({line_sum})"
+        )
+    return messages
 
 
 if __name__ == "__main__":
     import argparse
 
+    from batch import batch_output_paths, is_output_dir, positive_int, run_batch
+
     # Set up command-line argument parsing
     parser = argparse.ArgumentParser(description="X12 837P -> simple claims JSON")
-    parser.add_argument("input", help="837P X12 file")
-    parser.add_argument("-o", "--output", help="JSON output (default: stdout)")
+    parser.add_argument("input", nargs="+", help="837P X12 file(s)")
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="JSON output file (default: stdout), or an output directory: used when "
+        "several inputs are given, or when it exists or ends with a path separator",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        help="worker processes for multiple inputs (default: one per CPU)",
+    )
+    output_format = parser.add_mutually_exclusive_group()
+    output_format.add_argument(
+        "--compact",
+        dest="fmt",
+        action="store_const",
+        const="compact",
+        help="write compact JSON without indentation (faster, smaller output)",
+    )
+    output_format.add_argument(
+        "--ndjson",
+        dest="fmt",
+        action="store_const",
+        const="ndjson",
+        help="write newline-delimited JSON, one claim per line",
+    )
+    parser.set_defaults(fmt=FORMATS[0])
+    parser.add_argument(
+        "--check-totals",
+        action="store_true",
+        help="report claims whose total charge differs from the sum of their line charges",
+    )
     args = parser.parse_args()
 
-    claims = extract_claims_from_837p(args.input)
-    text = json.dumps(claims, indent=2)
-
-    if args.output:
-        Path(args.output).write_text(text, encoding="utf-8")
+    if len(args.input) == 1 and not is_output_dir(args.output):
+        messages = _convert_file(args.input[0], args.output, args.check_totals, args.fmt)
     else:
-        print(text)
+        # Several inputs, or an output directory: convert in parallel, one
+        # <stem>.json (or <stem>.ndjson) per input
+        if not args.output:
+            parser.error("-o/--output directory is required with multiple input files")
+        try:
+            suffix = ".ndjson" if args.fmt == "ndjson" else ".json"
+            outputs = batch_output_paths(args.input, args.output, suffix)
+        except ValueError as e:
+            parser.error(str(e))
+        except FileExistsError:
+            parser.error(f"-o/--output {args.output} exists and is not a directory")
+        results = run_batch(
+            _convert_file, args.input, outputs, args.check_totals, args.fmt, jobs=args.jobs
+        )
+        messages = [message for result in results for message in result]
+
+    for message in messages:
+        print(message, file=sys.stderr)
+    if messages:
+        sys.exit(1)
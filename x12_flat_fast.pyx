@@ -0,0 +1,32 @@
+# cython: language_level=3
+"""
+x12_flat_fast.pyx
+
+Compiled version of the per-segment loop in x12_to_json_flat.py.
+
+pyx12 still does the tokenizing; this module only moves the loop that turns
+each pyx12 Segment into a {"segment_id": ..., "elements": [...]} dict out of
+the interpreter. The output is identical to x12_to_json_flat._py_segment_dicts,
+which is used automatically when this extension has not been built.
+
+Build in place (requires Cython and a C compiler):
+    cythonize -i x12_flat_fast.pyx
+"""
+
+from sys import intern
+
+
+def segment_dicts(reader, only=None):
+    """
+    Yield a {"segment_id", "elements"} dict for each segment from an X12Reader.
+
+    If only is given, segments whose ID is not in it get "elements": None.
+    """
+    cdef object seg
+    cdef str seg_id
+    for seg in reader:
+        seg_id = intern(seg.get_seg_id())
+        if only is not None and seg_id not in only:
+            yield {"segment_id": seg_id, "elements": None}
+        else:
+            yield {"segment_id": seg_id, "elements": list(seg.values_iterator())}
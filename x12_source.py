@@ -0,0 +1,88 @@
+"""
+x12_source.py
+
+Opens X12 input files for the pyx12 readers used by both converters.
+
+pyx12 pulls its input through many small read() calls. For ordinary files it
+is cheaper to read the whole file once and hand pyx12 an in-memory stream, so
+every later read is a plain string slice with no I/O or incremental decoding.
+
+Large files are memory-mapped instead of read into memory. pyx12 then reads
+through a small buffered text stream over the mapping: the OS page cache
+handles read-ahead, and the process never holds a decoded copy of the whole
+file, so memory use stays flat regardless of file size.
+
+Files are decoded as UTF-8, as the original path.open("r") did, with invalid
+bytes replaced (U+FFFD) rather than raising a decode error.
+"""
+
+from __future__ import annotations
+
+import io
+import mmap
+from pathlib import Path
+from typing import TextIO
+
+# Files up to this size are read into memory in one go; larger files are
+# memory-mapped.
+SLURP_MAX_BYTES = 32 * 1024 * 1024
+
+ENCODING = "utf-8"
+ENCODING_ERRORS = "replace"
+
+
+class _MmapReader(io.RawIOBase):
+    """
+    Read-only raw stream over a memory-mapped file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        super().__init__()
+        self._file = path.open("rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        # Copy straight from the mapping into the caller's buffer; mmap.read()
+        # would first build an intermediate bytes object
+        pos = self._mm.tell()
+        n = min(len(buffer), len(self._mm) - pos)
+        with memoryview(self._mm) as view:
+            buffer[:n] = view[pos : pos + n]
+        self._mm.seek(pos + n)
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._mm.close()
+            self._file.close()
+        super().close()
+
+
+def open_x12(path: str | Path) -> TextIO:
+    """
+    Open an X12 file as a text stream suitable for pyx12.
+
+    Args:
+        path: File path to the X12 file (string or Path object)
+
+    Returns:
+        An in-memory io.StringIO holding the whole file, or a text stream over
+        a memory mapping of the file for files larger than SLURP_MAX_BYTES.
+        Either can be used as a context manager.
+
+    Raises:
+        FileNotFoundError: If the specified file doesn't exist
+    """
+    path = Path(path)
+    if path.stat().st_size <= SLURP_MAX_BYTES:
+        return io.StringIO(path.read_text(encoding=ENCODING, errors=ENCODING_ERRORS))
+    return io.TextIOWrapper(
+        io.BufferedReader(_MmapReader(path)), encoding=ENCODING, errors=ENCODING_ERRORS
+    )
@@ -38,13 +38,113 @@ Usage:
 """
 
 from pathlib import Path
-import json
+import itertools
+import sys
+from sys import intern
+from typing import AbstractSet, BinaryIO, Iterator
 
 import pyx12.x12file as x12file
 import pyx12.errors as x12errors
 
+from json_stream import (
+    FORMATS,
+    dumps,
+    dumps_compact,
+    open_output,
+    write_json_array,
+    write_json_array_compact,
+    write_ndjson,
+)
+from x12_source import open_x12
 
-def x12_to_flat_json(path: str | Path) -> dict:
+
+def _py_segment_dicts(
+    reader: x12file.X12Reader, only: AbstractSet[str] | None = None
+) -> Iterator[dict]:
+    """
+    Yield a {"segment_id", "elements"} dict for each segment from an X12Reader.
+
+    If only is given, segments whose ID is not in it get "elements": None and
+    their element values are never extracted.
+
+    This is the per-segment hot loop of the flat parser. x12_flat_fast.pyx holds
+    a compiled copy of it that is used instead when the extension is built.
+    """
+    # Iterate through each segment in the X12 file
+    for seg in reader:
+        # Extract the segment identifier (e.g., 'ISA', 'GS', 'ST', 'CLM', 'SV1')
+        # Interned: there are only ~120 distinct IDs, so every segment dict
+        # shares one string object per ID instead of a fresh copy each
+        seg_id = intern(seg.get_seg_id())
+
+        # Skip element extraction for segments the caller did not ask for
+        if only is not None and seg_id not in only:
+            yield {
+                "segment_id": seg_id,
+                "elements": None,
+            }
+            continue
+
+        # Extract all element values from the segment in order
+        # values_iterator() provides each element from the segment sequentially
+        elements = list(seg.values_iterator())
+
+        # Yield this segment with its ID and element values
+        yield {
+            "segment_id": seg_id,
+            "elements": elements,
+        }
+
+
+try:
+    # Optional compiled version of the loop above; build it in place with
+    # `cythonize -i x12_flat_fast.pyx` (requires Cython and a C compiler)
+    from x12_flat_fast import segment_dicts as _segment_dicts
+except ImportError:
+    _segment_dicts = _py_segment_dicts
+
+
+def iter_flat_segments(path: str | Path, only: AbstractSet[str] | None = None) -> Iterator[dict]:
+    """
+    Yield the segments of an X12 file one at a time, in file order.
+
+    This is the streaming form of x12_to_flat_json(): each segment dict is
+    yielded as soon as it is read, so callers can write output incrementally
+    instead of holding every segment in memory.
+
+    Args:
+        path: File path to the X12 file (string or Path object)
+        only: Optional set of segment IDs to extract elements for; see
+            x12_to_flat_json()
+
+    Yields:
+        {"segment_id": "ISA", "elements": [...]} for each segment in the file
+
+    Raises:
+        FileNotFoundError: If the specified file doesn't exist
+        RuntimeError: If the file is not valid X12 format
+    """
+    # Convert path to Path object for consistent handling
+    path = Path(path)
+
+    # Validate that the file exists
+    if not path.is_file():
+        raise FileNotFoundError(path)
+
+    # Open and parse the X12 file (read into memory up front unless very large)
+    # IMPORTANT: pyx12.X12Reader requires an open file object, not a string path
+    with open_x12(path) as f:
+        # Create X12 reader and handle any parsing errors
+        try:
+            reader = x12file.X12Reader(f)
+        except x12errors.X12Error as e:
+            raise RuntimeError(f"{path} does not look like X12: {e}")
+
+        # Convert each segment in the X12 file, in file order
+        yield from _segment_dicts(reader, only)
+
+
+def x12_to_flat_json(path: str | Path, only: AbstractSet[str] | None = None) -> dict:
     """
     Parse an X12 file and convert it to a flat JSON representation.
 
@@ -59,6 +159,10 @@ def x12_to_flat_json(path: str | Path) -> dict:
 
     Args:
         path: File path to the X12 file (string or Path object)
+        only: Optional set of segment IDs (e.g. {"CLM", "SV1"}) to extract
+            elements for. Every segment is still listed, but segments whose ID
+            is not in the set have "elements": None, which skips the cost of
+            reading their values. By default all elements are extracted.
 
     Returns:
         Dictionary with structure:
@@ -88,66 +192,146 @@ def x12_to_flat_json(path: str | Path) -> dict:
         FileNotFoundError: If the specified file doesn't exist
         RuntimeError: If the file is not valid X12 format
     """
-    # Convert path to Path object for consistent handling
-    path = Path(path)
+    # Collect the streamed segments along with the file name
+    return {"file": str(Path(path)), "segments": list(iter_flat_segments(path, only))}
 
-    # Validate that the file exists
-    if not path.is_file():
-        raise FileNotFoundError(path)
 
-    # Initialize list to store all segments from the X12 file
-    segments = []
+def write_flat_json(
+    path: str | Path,
+    out: BinaryIO,
+    fmt: str = "indent",
+    only: AbstractSet[str] | None = None,
+) -> None:
+    """
+    Stream the x12_to_flat_json() document for an X12 file to a binary stream.
+
+    Segments are written as they are read, so neither the segment list nor the
+    full JSON text is ever held in memory. The default "indent" format is
+    equivalent to json.dumps(x12_to_flat_json(path, only), indent=2), with
+    non-ASCII characters written as UTF-8 rather than \\uXXXX escapes.
 
-    # Open and parse the X12 file
-    # IMPORTANT: pyx12.X12Reader requires an open file object, not a string path
-    with path.open("r") as f:
-        # Create X12 reader and handle any parsing errors
-        try:
-            reader = x12file.X12Reader(f)
-        except x12errors.X12Error as e:
-            raise RuntimeError(f"{path} does not look like X12: {e}")
+    Args:
+        path: File path to the X12 file (string or Path object)
+        out: Binary stream to write the UTF-8 JSON document to
+        fmt: Output format, one of json_stream.FORMATS: "indent" (indented
+            JSON), "compact" (JSON without whitespace) or "ndjson" (a
+            {"file": ...} header line followed by one segment per line)
+        only: Optional set of segment IDs to extract elements for; see
+            x12_to_flat_json()
 
-        # Iterate through each segment in the X12 file
-        for seg in reader:
-            # Extract the segment identifier (e.g., 'ISA', 'GS', 'ST', 'CLM', 'SV1')
-            seg_id = seg.get_seg_id()
+    Raises:
+        FileNotFoundError: If the specified file doesn't exist
+        RuntimeError: If the file is not valid X12 format
+    """
+    segments = iter_flat_segments(path, only)
+    # Read the first segment before writing anything so that a missing or
+    # non-X12 file raises without leaving a partial document behind
+    first = list(itertools.islice(segments, 1))
 
-            # Extract all element values from the segment in order
-            # values_iterator() provides each element from the segment sequentially
-            elements = [v for v in seg.values_iterator()]
+    segments = itertools.chain(first, segments)
 
-            # Add this segment to our list with its ID and element values
-            segments.append(
-                {
-                    "segment_id": seg_id,
-                    "elements": elements,
-                }
-            )
+    if fmt == "ndjson":
+        out.write(dumps_compact({"file": str(Path(path))}) + b"\n")
+        write_ndjson(segments, out)
+    elif fmt == "compact":
+        out.write(b'{"file":' + dumps_compact(str(Path(path))) + b',"segments":')
+        write_json_array_compact(segments, out)
+        out.write(b"}")
+    else:
+        out.write(b'{\n  "file": ' + dumps(str(Path(path))) + b',\n  "segments": ')
+        write_json_array(segments, out, level=1)
+        out.write(b"\n}")
+
+
+def _convert_file(
+    input_path: str,
+    output_path: str | None,
+    fmt: str = "indent",
+    only: AbstractSet[str] | None = None,
+) -> None:
+    """
+    Convert one X12 file for the command-line interface.
 
-    # Return the complete data structure with filename and all segments
-    return {"file": str(path), "segments": segments}
+    Writes the flat JSON in the given output format (see write_flat_json()) to
+    output_path, or to stdout when it is None.
+    """
+    # Write output to file or stdout, one segment at a time
+    if output_path:
+        # Write to specified output file
+        with open_output(output_path) as out:
+            write_flat_json(input_path, out, fmt, only)
+    else:
+        # Print to stdout (console)
+        write_flat_json(input_path, sys.stdout.buffer, fmt, only)
+        if fmt != "ndjson":
+            # NDJSON lines are already newline-terminated
+            sys.stdout.buffer.write(b"\n")
 
 
 if __name__ == "__main__":
     # Command-line interface for converting X12 files to JSON
     import argparse
 
+    from batch import batch_output_paths, is_output_dir, positive_int, run_batch
+
     # Set up command-line argument parser
     parser = argparse.ArgumentParser(description="Flat X12 -> JSON")
-    parser.add_argument("input", help="X12 837P file")
-    parser.add_argument("-o", "--output", help="JSON output file (default: stdout)")
+    parser.add_argument("input", nargs="+", help="X12 837P file(s)")
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="JSON output file (default: stdout), or an output directory: used when "
+        "several inputs are given, or when it exists or ends with a path separator",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        help="worker processes for multiple inputs (default: one per CPU)",
+    )
+    output_format = parser.add_mutually_exclusive_group()
+    output_format.add_argument(
+        "--compact",
+        dest="fmt",
+        action="store_const",
+        const="compact",
+        help="write compact JSON without indentation (faster, smaller output)",
+    )
+    output_format.add_argument(
+        "--ndjson",
+        dest="fmt",
+        action="store_const",
+        const="ndjson",
+        help="write newline-delimited JSON: a file header line, then one segment per line",
+    )
+    parser.set_defaults(fmt=FORMATS[0])
+    parser.add_argument(
+        "--only",
+        metavar="IDS",
+        help="comma-separated segment IDs to extract elements for, e.g. CLM,SV1; "
+        "other segments are listed with null elements",
+    )
     args = parser.parse_args()
 
-    # Parse the X12 file to JSON data structure
-    data = x12_to_flat_json(args.input)
+    # Segment IDs are upper case; tolerate "clm, sv1" and stray commas
+    only = (
+        frozenset(s.strip().upper() for s in args.only.split(",") if s.strip())
+        if args.only
+        else None
+    )
 
-    # Convert to formatted JSON string with 2-space indentation
-    text = json.dumps(data, indent=2)
-
-    # Write output to file or print to stdout
-    if args.output:
-        # Write to specified output file
-        Path(args.output).write_text(text, encoding="utf-8")
+    if len(args.input) == 1 and not is_output_dir(args.output):
+        _convert_file(args.input[0], args.output, args.fmt, only)
     else:
-        # Print to stdout (console)
-        print(text)
+        # Several inputs, or an output directory: convert in parallel, one
+        # <stem>.json (or <stem>.ndjson) per input
+        if not args.output:
+            parser.error("-o/--output directory is required with multiple input files")
+        try:
+            suffix = ".ndjson" if args.fmt == "ndjson" else ".json"
+            outputs = batch_output_paths(args.input, args.output, suffix)
+        except ValueError as e:
+            parser.error(str(e))
+        except FileExistsError:
+            parser.error(f"-o/--output {args.output} exists and is not a directory")
+        run_batch(_convert_file, args.input, outputs, args.fmt, only, jobs=args.jobs)